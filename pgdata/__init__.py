@@ -1 +1,2 @@
 from .client import PgDataClient
+from .async_client import AsyncPgDataClient
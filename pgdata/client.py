@@ -1,8 +1,31 @@
 """Data download client for pgdata"""
 import datetime as dt
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 
 class PgDataClient():
@@ -24,60 +47,269 @@ class PgDataClient():
     TIMEOUT = (3, 3.05)
     HDR_ACCEPT = 'application/json; version=1.0'
     HDR_CONTENT = 'application/json'
+    CACHE_TTL = 3600  # seconds; reference data changes rarely
+    TOKEN_CACHE_TTL = 86400  # seconds a cached auth token is trusted
 
-    def __init__(self, host, port, token=None, username=None, password=None):
+    def __init__(self, host, port, token=None, username=None, password=None,
+            default_page_size=1000, token_cache_path=None):
         assert (token) or (username and password)
         # remove trailing slashes
-        while host[-1] == '/':
-            host = host[:-1]
+        host = host.rstrip('/')
         self.host = f'{host}:{port}'
         self.token = token
         self.username = username
         self.password = password
+        # Larger pages mean fewer round-trips on long pulls; DRF caps
+        # the size server-side and `_fetch_first_page` backs off if the
+        # hint is rejected outright.
+        self.default_page_size = default_page_size
+        # Where to persist the auth token between runs, so short-lived
+        # scripts skip the token round-trip. None disables caching.
+        self.token_cache_path = Path(token_cache_path) if token_cache_path else None
+        # Reuse one session (and its pooled connections) for every request
+        # so only the first call to each host pays the TCP+TLS handshake.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 502, 503, 504],
+            ),
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        # Fetches the remaining pages of a paginated response in parallel
+        # (or prefetches the next one, on the chained fallback path).
+        self._executor = ThreadPoolExecutor(max_workers=8)
+        # (uri, params) -> (expires_at, results) for reference endpoints.
+        self._cache = {}
+        # (uri, params) -> (etag, results) for conditional re-fetches.
+        self._etag_cache = {}
 
     def __enter__(self):
         if not self.token:
             self.token = self._get_token()
+        self._session.headers.update({
+            'Accept': self.HDR_ACCEPT,
+            'Content-Type': self.HDR_CONTENT,
+            'Authorization': f'Token {self.token}',
+            # Compressed bodies are ~10x smaller for the hourly JSON
+            # payloads; urllib3 decodes transparently. Only advertise
+            # brotli if the decoder is actually installed.
+            'Accept-Encoding': 'br, gzip, deflate' if brotli else 'gzip, deflate',
+        })
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        pass
-
-    def _set_request_params(self, kwargs):
-        if 'timeout' not in kwargs:
-            kwargs['timeout'] = self.TIMEOUT
-        if 'headers' not in kwargs:
-            kwargs['headers'] = dict()
-        kwargs['headers']['Accept'] = self.HDR_ACCEPT
-        kwargs['headers']['Content-Type'] = self.HDR_CONTENT
-        kwargs['headers']['Authorization'] = f'Token {self.token}'
-        return kwargs
+        self._executor.shutdown()
+        self._session.close()
+
+    @staticmethod
+    def _parse_json(res):
+        # orjson decodes the raw bytes directly and is several times
+        # faster than stdlib json on the large hourly payloads.
+        if orjson is not None:
+            return orjson.loads(res.content)
+        return res.json()
 
     def _get(self, *args, **kwargs):
-        kwargs = self._set_request_params(kwargs)
-        res = requests.get(*args, **kwargs)
+        kwargs.setdefault('timeout', self.TIMEOUT)
+        # The DRF `next` links are absolute, so nothing should redirect;
+        # skipping the redirect handling saves a branch per request.
+        kwargs.setdefault('allow_redirects', False)
+        res = self._session.get(*args, **kwargs)
+        if res.status_code == 401 and self.username and self.password:
+            # A cached token may have been revoked; re-auth once and retry.
+            self._refresh_token()
+            res = self._session.get(*args, **kwargs)
         res.raise_for_status()
         return res
 
     def _get_token(self):
+        token = self._read_cached_token()
+        if token:
+            return token
+
         uri = f'{self.host}/api-token-auth/'
         headers = {'Content-Type': self.HDR_CONTENT, 'Accept': self.HDR_ACCEPT}
         data = {'username': self.username,'password': self.password}
-        res = requests.post(uri, json=data, timeout=self.TIMEOUT, headers=headers)
-        res = res.json()
+        res = self._session.post(uri, json=data, timeout=self.TIMEOUT, headers=headers)
+        res = self._parse_json(res)
+        self._write_cached_token(res['token'])
         return res['token']
 
-    def _collect_results(self, uri, params={}):
+    def _read_cached_token(self):
+        if not self.token_cache_path:
+            return None
+        try:
+            cached = json.loads(self.token_cache_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if cached.get('expires_at', 0) > time.time():
+            return cached.get('token')
+        return None
+
+    def _write_cached_token(self, token):
+        if not self.token_cache_path:
+            return
+        cached = {'token': token, 'expires_at': time.time() + self.TOKEN_CACHE_TTL}
+        # Write 0600 and rename into place so a crash or a concurrent
+        # reader never sees a partial file.
+        tmp = self.token_cache_path.with_name(self.token_cache_path.name + '.tmp')
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(json.dumps(cached))
+        os.replace(tmp, self.token_cache_path)
+
+    def _refresh_token(self):
+        if self.token_cache_path:
+            try:
+                self.token_cache_path.unlink()
+            except OSError:
+                pass
+        self.token = self._get_token()
+        self._session.headers['Authorization'] = f'Token {self.token}'
+
+    def _fetch_first_page(self, uri, params, headers=None):
+        """Request the first page, backing off the page_size hint if the
+        server rejects it with HTTP 400 (halving, then dropping it).
+        Later pages follow the server-built `next` links, which carry
+        whatever size the server accepted. Returns the raw response.
+        """
+        while True:
+            try:
+                return self._get(uri, params=params, headers=headers)
+            except requests.HTTPError as err:
+                if err.response is None or err.response.status_code != 400 \
+                        or 'page_size' not in params:
+                    raise
+                if params['page_size'] > 100:
+                    params['page_size'] //= 2
+                else:
+                    del params['page_size']
+
+    def _collect_results(self, uri, params=None, page_size=None):
+        params = dict(params or {})
+        params.setdefault('page_size', page_size or self.default_page_size)
+
+        # Revalidate against any previously seen ETag for this query; a
+        # 304 means nothing changed and the cached rows can be reused
+        # without transferring or parsing a body. Servers that don't
+        # set ETags never populate the cache, making this a no-op.
+        key = (uri, tuple(sorted(params.items())))
+        cached = self._etag_cache.get(key)
+        headers = {'If-None-Match': cached[0]} if cached else None
+
+        first = self._fetch_first_page(uri, params, headers=headers)
+        if cached and first.status_code == 304:
+            return cached[1]
+
+        res = self._parse_json(first)
+        page = res['results']
+        count = res.get('count')
+
+        if not res['next']:
+            # Everything fit in one page; hand it back without copying.
+            results = page
+        elif not count or not page:
+            results = self._collect_results_chained(res)
+        else:
+            # DRF pagination is deterministic (?page=N), so once the
+            # first page reveals the total count the remaining pages can
+            # all be requested in parallel instead of waiting on each
+            # next link. The result list is sized once from the count
+            # and filled by slice assignment in page order.
+            n_pages = math.ceil(count / len(page))
+            futures = [
+                self._executor.submit(self._get, uri, params={**params, 'page': p})
+                for p in range(2, n_pages + 1)
+            ]
+            results = [None] * count
+            results[:len(page)] = page
+            idx = len(page)
+            for future in futures:
+                page = self._parse_json(future.result())['results']
+                results[idx:idx + len(page)] = page
+                idx += len(page)
+
+            # Trim in case the server reported more rows than it returned.
+            if idx < len(results):
+                del results[idx:]
+
+        etag = first.headers.get('ETag')
+        if etag:
+            self._etag_cache[key] = (etag, results)
+        return results
+
+    def _collect_results_chained(self, res):
+        """Serial fallback for paginated responses without a `count`:
+        walk the `next` links, prefetching each page while the previous
+        one is being collected.
+        """
         results = []
 
         while True:
-            res = self._get(uri, params=params)
-            res = res.json()
-            results += res['results']
+            # Kick off the next page fetch before collecting this one,
+            # so the socket stays busy while the main thread works.
             if res['next']:
-                uri = res['next']
-            else:
+                future = self._executor.submit(self._get, res['next'])
+            results.extend(res['results'])
+            if not res['next']:
                 return results
+            res = self._parse_json(future.result())
+
+    def _collect_results_cached(self, uri, params=None):
+        """`_collect_results` memoized for CACHE_TTL seconds.
+
+        Used by the reference endpoints (locations, sources, systems,
+        utility footprint), whose data changes on the order of days:
+        repeat calls within a process skip the network entirely.
+        """
+        params = params or {}
+        key = (uri, tuple(sorted(params.items())))
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        results = self._collect_results(uri, params)
+        self._cache[key] = (time.monotonic() + self.CACHE_TTL, results)
+        return results
+
+    def invalidate_cache(self):
+        """Clear the reference-data and ETag caches so the next call
+        re-fetches from the server.
+        """
+        self._cache.clear()
+        self._etag_cache.clear()
+
+    def _collect_results_df(self, uri, params=None, page_size=None):
+        """Like `_collect_results`, but builds one DataFrame per page and
+        concatenates them, so rows go straight into columnar storage
+        instead of accumulating as a list of dicts. The 'ts' column is
+        parsed to datetime64.
+        """
+        if pd is None:
+            raise ImportError('pandas is required for the *_df methods')
+
+        params = dict(params or {})
+        params.setdefault('page_size', page_size or self.default_page_size)
+        res = self._parse_json(self._fetch_first_page(uri, params))
+        frames = []
+
+        while True:
+            if res['next']:
+                future = self._executor.submit(self._get, res['next'])
+            frames.append(pd.DataFrame.from_records(res['results']))
+            if not res['next']:
+                break
+            res = self._parse_json(future.result())
+
+        df = pd.concat(frames, ignore_index=True)
+        if 'ts' in df.columns:
+            df['ts'] = pd.to_datetime(df['ts'])
+        return df
 
     def get_locations(self) -> list:
         """Downloads complete list of location details
@@ -94,7 +326,7 @@ class PgDataClient():
             }
         """
         uri = f'{self.host}/api/locations'
-        return self._collect_results(uri)
+        return self._collect_results_cached(uri)
 
     def get_systems(self, system_id: str=None, search: str=None) -> list:
         """Download a complete list of system details.
@@ -128,7 +360,7 @@ class PgDataClient():
         elif search:
             params['search'] = search
 
-        return self._collect_results(uri, params)
+        return self._collect_results_cached(uri, params)
 
     def get_gross_daily_kwh(self, system_id: str, start_date: dt.date,
             end_date: dt.date) -> list:
@@ -157,6 +389,45 @@ class PgDataClient():
         }
         return self._collect_results(uri, params)
 
+    def get_gross_daily_kwh_bulk(self, system_ids: list, start_date: dt.date,
+            end_date: dt.date, max_workers: int=16) -> dict:
+        """Download daily gross generation for many systems concurrently.
+
+        The per-system requests are independent, so they are issued in
+        parallel over the pooled session. Keep max_workers at or below
+        the session's connection pool size (20) and mind any server-side
+        rate limits when raising it.
+
+        Args:
+            system_ids (list) - System IDs to download data for
+            start_date (dt.date) - Starting date of date range for which to download data
+            end_date (dt.date) - Ending date of date range for which to download data
+            max_workers (int) - Number of concurrent requests
+
+        Returns:
+            Dict mapping each system ID to its `get_gross_daily_kwh` result.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                system_id: executor.submit(
+                    self.get_gross_daily_kwh, system_id, start_date, end_date)
+                for system_id in system_ids
+            }
+            return {system_id: f.result() for system_id, f in futures.items()}
+
+    def get_gross_daily_kwh_df(self, system_id: str, start_date: dt.date,
+            end_date: dt.date):
+        """Same as `get_gross_daily_kwh`, but returns a pandas DataFrame
+        with the 'ts' column parsed to datetime64. Requires pandas.
+        """
+        uri = f'{self.host}/api/gross-kwh-daily'
+        params = {
+            'system_id': system_id,
+            'ts__gte': start_date.isoformat(),
+            'ts__lte': end_date.isoformat(),
+        }
+        return self._collect_results_df(uri, params)
+
     def get_irradiation_sources(self) -> list:
         """Get a complete list of all irradiation source details.
 
@@ -171,7 +442,7 @@ class PgDataClient():
             }
         """
         uri = f'{self.host}/api/irradiation-source'
-        return self._collect_results(uri)
+        return self._collect_results_cached(uri)
 
     def get_pvout_sources(self) -> list:
         """Get a complete list of all energy forecast data source details.
@@ -184,7 +455,7 @@ class PgDataClient():
             }
         """
         uri = f'{self.host}/api/pvout-source'
-        return self._collect_results(uri)
+        return self._collect_results_cached(uri)
 
     def get_wind_sources(self) -> list:
         """Get a complete list of all wind data source details.
@@ -200,7 +471,7 @@ class PgDataClient():
             }
         """
         uri = f'{self.host}/api/wind-source'
-        return self._collect_results(uri)
+        return self._collect_results_cached(uri)
 
     def get_temperature_sources(self) -> list:
         """Get a complete list of all temperature data source details.
@@ -216,7 +487,7 @@ class PgDataClient():
             }
         """
         uri = f'{self.host}/api/temperature-source'
-        return self._collect_results(uri)
+        return self._collect_results_cached(uri)
 
     def get_irradiation_daily(self, source: str, start_date: dt.date,
         end_date: dt.date) -> list:
@@ -276,6 +547,19 @@ class PgDataClient():
         }
         return self._collect_results(uri, params)
 
+    def get_irradiation_hourly_df(self, source: str, start_date: dt.datetime,
+        end_date: dt.datetime):
+        """Same as `get_irradiation_hourly`, but returns a pandas DataFrame
+        with the 'ts' column parsed to datetime64. Requires pandas.
+        """
+        uri = f'{self.host}/api/irradiation-hourly'
+        params = {
+            'ts__gte': start_date.isoformat(),
+            'ts__lte': end_date.isoformat(),
+            'source': source,
+        }
+        return self._collect_results_df(uri, params)
+
     def get_utility_footprint(self) -> list:
         """Collect a list of utility regions.
 
@@ -286,7 +570,7 @@ class PgDataClient():
             }
         """
         uri = f'{self.host}/api/utility-footprint'
-        return self._collect_results(uri)
+        return self._collect_results_cached(uri)
 
     def get_util_revenues(self, system_id: str, period_year: Optional[int]=None,
             period_month: Optional[int]=None) -> list:
@@ -329,6 +613,22 @@ class PgDataClient():
         uri = f'{self.host}/api/utility-revenue'
         return self._collect_results(uri, params)
 
+    def get_util_revenues_bulk(self, system_ids: list, period_year: Optional[int]=None,
+            period_month: Optional[int]=None, max_workers: int=16) -> dict:
+        """Download utility revenue statements for many systems concurrently.
+        See `get_gross_daily_kwh_bulk` for guidance on max_workers.
+
+        Returns:
+            Dict mapping each system ID to its `get_util_revenues` result.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                system_id: executor.submit(
+                    self.get_util_revenues, system_id, period_year, period_month)
+                for system_id in system_ids
+            }
+            return {system_id: f.result() for system_id, f in futures.items()}
+
     def get_util_expenses(self, system_id: str, period_year: Optional[int]=None,
             period_month: Optional[int]=None):
         """Get the full history of utility statements for the specified system ID.
@@ -370,6 +670,22 @@ class PgDataClient():
         uri = f'{self.host}/api/utility-expense'
         return self._collect_results(uri, params)
 
+    def get_util_expenses_bulk(self, system_ids: list, period_year: Optional[int]=None,
+            period_month: Optional[int]=None, max_workers: int=16) -> dict:
+        """Download utility expense statements for many systems concurrently.
+        See `get_gross_daily_kwh_bulk` for guidance on max_workers.
+
+        Returns:
+            Dict mapping each system ID to its `get_util_expenses` result.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                system_id: executor.submit(
+                    self.get_util_expenses, system_id, period_year, period_month)
+                for system_id in system_ids
+            }
+            return {system_id: f.result() for system_id, f in futures.items()}
+
     def get_pvout_daily(self, source: str, start_date: dt.date,
         end_date: dt.date) -> list:
         """Collect daily energy generation forecasts in kWh.
@@ -422,6 +738,19 @@ class PgDataClient():
         }
         return self._collect_results(uri, params)
 
+    def get_pvout_hourly_df(self, source: str, start_date: dt.datetime,
+        end_date: dt.datetime):
+        """Same as `get_pvout_hourly`, but returns a pandas DataFrame
+        with the 'ts' column parsed to datetime64. Requires pandas.
+        """
+        uri = f'{self.host}/api/pvout-hourly'
+        params = {
+            'ts__gte': start_date.isoformat(),
+            'ts__lte': end_date.isoformat(),
+            'source': source,
+        }
+        return self._collect_results_df(uri, params)
+
     def get_wind_hourly(self, source: str, start_date: dt.datetime,
         end_date: dt.datetime) -> list:
         """Collect hourly wind measurements in kWh.
@@ -449,6 +778,19 @@ class PgDataClient():
         }
         return self._collect_results(uri, params)
 
+    def get_wind_hourly_df(self, source: str, start_date: dt.datetime,
+        end_date: dt.datetime):
+        """Same as `get_wind_hourly`, but returns a pandas DataFrame
+        with the 'ts' column parsed to datetime64. Requires pandas.
+        """
+        uri = f'{self.host}/api/wind-hourly'
+        params = {
+            'ts__gte': start_date.isoformat(),
+            'ts__lte': end_date.isoformat(),
+            'source': source,
+        }
+        return self._collect_results_df(uri, params)
+
     def get_temperature_hourly(self, source: str, start_date: dt.datetime,
         end_date: dt.datetime) -> list:
         """Collect hourly temperature measurements at the specified source.
@@ -474,3 +816,16 @@ class PgDataClient():
             'source': source,
         }
         return self._collect_results(uri, params)
+
+    def get_temperature_hourly_df(self, source: str, start_date: dt.datetime,
+        end_date: dt.datetime):
+        """Same as `get_temperature_hourly`, but returns a pandas DataFrame
+        with the 'ts' column parsed to datetime64. Requires pandas.
+        """
+        uri = f'{self.host}/api/temperature-hourly'
+        params = {
+            'ts__gte': start_date.isoformat(),
+            'ts__lte': end_date.isoformat(),
+            'source': source,
+        }
+        return self._collect_results_df(uri, params)